@@ -1,130 +1,403 @@
 
 import os
+import re
+import sqlite3
+import threading
+import time
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- Mock Database Implementation ---
+# Used when no DB_HOST is configured. Backed by one in-memory SQLite database
+# shared by all connections, with a small shim that rewrites the MySQL dialect
+# used in this app. State persists for the lifetime of the process so flows
+# like OTP -> login -> inspection work.
+
+# Tables the app writes to but never creates itself (they come from the legacy
+# schema), plus users with every column any endpoint uses: /auth/demo-login
+# creates a 2-column users table if it runs first.
+MOCK_BOOTSTRAP_SQL = """
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, phone VARCHAR(255), name VARCHAR(255), email VARCHAR(255), isVerified TINYINT DEFAULT 0, createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS cars (id INTEGER PRIMARY KEY, userId VARCHAR(255), brand VARCHAR(100), model VARCHAR(100), carType VARCHAR(50));
+CREATE TABLE IF NOT EXISTS reports (id INTEGER PRIMARY KEY, carId BIGINT, reportStage INT, damageScore FLOAT, summary TEXT, createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS carphotoangles (id INTEGER PRIMARY KEY, angleCode VARCHAR(50));
+CREATE TABLE IF NOT EXISTS reportphotos (id INTEGER PRIMARY KEY, reportId BIGINT, angleId BIGINT, photoUrl VARCHAR(500), aiAnalysis TEXT);
+CREATE TABLE IF NOT EXISTS submissions (id INTEGER PRIMARY KEY, user_id VARCHAR(255), car_model VARCHAR(50), analysis_json JSON, comparison_text TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+INSERT INTO carphotoangles (angleCode) VALUES ('front'), ('back'), ('left'), ('right'), ('roof'), ('interior');
+"""
+
+# (pattern, replacement) applied in order to the unquoted parts of every statement
+MYSQL_TO_SQLITE = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\b\w*INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.I), "INTEGER PRIMARY KEY"),
+    (re.compile(r"\s+AUTO_INCREMENT\b", re.I), ""),
+    (re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.I), ""),
+    (re.compile(r"FROM_UNIXTIME\(\s*\?\s*\)", re.I), "datetime(?, 'unixepoch')"),
+]
+# String literals and quoted identifiers; split() puts them at odd indexes
+QUOTED = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+ON_DUPLICATE_KEY = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.I)
+# VALUES(col) only means "the value being inserted" after ON DUPLICATE KEY UPDATE
+UPSERT_VALUES = re.compile(r"\bVALUES\((\w+)\)", re.I)
+# Statements with no SQLite equivalent that are safe to ignore
+MYSQL_NOOPS = re.compile(r"^\s*(SET\s+FOREIGN_KEY_CHECKS|ALTER\s+TABLE\s+\w+\s+MODIFY\s+COLUMN)", re.I)
+SHOW_TABLES = re.compile(r"^\s*SHOW\s+TABLES\s*$", re.I)
+DESCRIBE = re.compile(r"^\s*(?:DESCRIBE|DESC)\s+(\w+)\s*$", re.I)
+SHOW_INDEX = re.compile(r"^\s*SHOW\s+(?:INDEX|INDEXES|KEYS)\s+FROM\s+(\w+)\s*$", re.I)
+
+_mock_db = None
+_mock_lock = threading.RLock()
+
+def _get_mock_db():
+    global _mock_db
+    with _mock_lock:
+        if _mock_db is None:
+            # Autocommit; every statement runs under _mock_lock so threads never interleave
+            _mock_db = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+            _mock_db.executescript(MOCK_BOOTSTRAP_SQL)
+        return _mock_db
+
+def translate_mysql(query):
+    parts = QUOTED.split(query)
+    in_upsert = False
+    for i in range(0, len(parts), 2):
+        text = parts[i]
+        for pattern, replacement in MYSQL_TO_SQLITE:
+            text = pattern.sub(replacement, text)
+        if not in_upsert:
+            match = ON_DUPLICATE_KEY.search(text)
+            if match:
+                in_upsert = True
+                text = text[:match.start()] + "ON CONFLICT DO UPDATE SET" + UPSERT_VALUES.sub(r"excluded.\1", text[match.end():])
+        else:
+            text = UPSERT_VALUES.sub(r"excluded.\1", text)
+        parts[i] = text
+    return "".join(parts)
+
 class MockCursor:
-    def __init__(self, connection):
+    def __init__(self, connection, dictionary=False):
         self.connection = connection
-        self.lastrowid = 1
+        self.dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+        self.description = None
+        self._rows = []
+        self._pos = 0
+
+    def _run(self, query, params, many=False):
+        if MYSQL_NOOPS.match(query):
+            self._set_result(None, [])
+            return
+
+        if SHOW_TABLES.match(query):
+            query = "SELECT name AS Tables_in_mock FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        elif DESCRIBE.match(query):
+            table = DESCRIBE.match(query).group(1)
+            query = f"""
+                SELECT name AS Field, type AS Type, CASE WHEN "notnull" THEN 'NO' ELSE 'YES' END AS "Null",
+                       CASE WHEN pk THEN 'PRI' ELSE '' END AS "Key", dflt_value AS "Default", '' AS Extra
+                FROM pragma_table_info('{table}')
+            """
+        elif SHOW_INDEX.match(query):
+            table = SHOW_INDEX.match(query).group(1)
+            with _mock_lock:
+                exists = _get_mock_db().execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+            if not exists:
+                # Like MySQL, a missing table is an error rather than an empty result
+                raise sqlite3.OperationalError(f"no such table: {table}")
+            query = f"""
+                SELECT '{table}' AS "Table", 1 - "unique" AS Non_unique, name AS Key_name
+                FROM pragma_index_list('{table}')
+            """
+        else:
+            query = translate_mysql(query)
+
+        with _mock_lock:
+            cur = _get_mock_db().cursor()
+            try:
+                if many:
+                    cur.executemany(query, params)
+                else:
+                    cur.execute(query, params or ())
+                self.lastrowid = cur.lastrowid
+                self.rowcount = cur.rowcount
+                self._set_result(cur.description, cur.fetchall() if cur.description else [])
+            finally:
+                cur.close()
+
+    def _set_result(self, description, rows):
+        self.description = description
+        if self.dictionary and description:
+            names = [col[0] for col in description]
+            rows = [dict(zip(names, row)) for row in rows]
+        self._rows = rows
+        self._pos = 0
+
+    def execute(self, query, params=None):
+        self._run(query, params)
+
+    def executemany(self, query, seq_params):
+        self._run(query, list(seq_params), many=True)
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def close(self):
         self._rows = []
 
+class MockConnection:
+    def cursor(self, dictionary=False, **kwargs):
+        return MockCursor(self, dictionary=dictionary)
+    
+    def commit(self):
+        pass # Autocommit
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def is_mock(self):
+        return True
+
+# --- Fallback for an unreachable DB ---
+# When DB_HOST is set but the database can't be reached, nothing is stored.
+# Inserts hand out distinct ids (999001/888001) that can't be mistaken for real
+# rows, and read endpoints check is_fallback and return empty results.
+
+class FallbackCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = None
+        self.rowcount = 0
+        self._row = None
+
     def execute(self, query, params=None):
         query = query.strip().upper()
-        print(f"MOCK DB EXEC: {query} | Params: {params}")
+        self._row = None
+        self.lastrowid = None
 
         if "INSERT INTO USERS" in query:
-             # Simulate creating a user
-             self.lastrowid = 999001  # Distinct Mock User ID
-        elif "SELECT ID FROM USERS" in query:
-             # Simulate finding a user
-             self._rows = None      # Use this to simulate "New User" -> Insert path
+            self.lastrowid = 999001 # Distinct Mock User ID
         elif "INSERT INTO INSPECTIONS" in query:
-             self.lastrowid = 888001 # Distinct Mock Inspection ID
-        elif "CREATE TABLE" in query or "ALTER TABLE" in query:
-             pass 
-        elif "INSERT INTO INSPECTION_IMAGES" in query:
-             pass
+            self.lastrowid = 888001 # Distinct Mock Inspection ID
         elif "INSERT INTO OTPS" in query:
-             # Mock OTP storage
-             # Params: (phone, otp, expires, otp, expires)
-             phone = params[0]
-             val = params[1]
-             # Store in the class-level dict for persistence across connections
-             MockConnection._mock_otps[phone] = val
+            # Params: (phone, otp, expires, otp, expires)
+            FallbackConnection._mock_otps[params[0]] = params[1]
         elif "SELECT OTP" in query and "FROM OTPS" in query:
-             # Params: (phone,)
-             phone = params[0]
-             if phone in MockConnection._mock_otps:
-                 self._rows = (MockConnection._mock_otps[phone],)
-             else:
-                 self._rows = None
+            if params[0] in FallbackConnection._mock_otps:
+                self._row = (FallbackConnection._mock_otps[params[0]],)
         elif "DELETE FROM OTPS" in query:
-             phone = params[0]
-             if phone in MockConnection._mock_otps:
-                 del MockConnection._mock_otps[phone]
+            FallbackConnection._mock_otps.pop(params[0], None)
+
+    def executemany(self, query, seq_params):
+        pass
 
     def fetchone(self):
-        return self._rows
+        row, self._row = self._row, None
+        return row
+
+    def fetchmany(self, size=1):
+        return []
+
+    def fetchall(self):
+        return []
 
     def close(self):
         pass
 
-class MockConnection:
+class FallbackConnection:
     _mock_otps = {} # Shared class-level storage for Mock OTPs
-    
-    def cursor(self):
-        return MockCursor(self)
-    
+
+    def cursor(self, **kwargs):
+        return FallbackCursor(self)
+
     def commit(self):
-        print("MOCK DB COMMIT (In-Memory Only)")
-        
+        pass
+
+    def rollback(self):
+        pass
+
     def close(self):
         pass
 
+    def is_connected(self):
+        return False
+
     def is_mock(self):
         return True
 
+    def is_fallback(self):
+        return True
+
 # ------------------------------------
 
-def get_connection():
-    # helper to get env or config
-    def get_config(key, default=None):
-        val = os.getenv(key)
-        if val is None:
-            try:
-                import config
-                val = getattr(config, key, default)
-            except ImportError:
-                val = default
-        
-        # Clean value (remove quotes and whitespace)
-        if isinstance(val, str):
-            val = val.strip().strip('"').strip("'")
-        return val
+# helper to get env or config
+def get_config(key, default=None):
+    val = os.getenv(key)
+    if val is None:
+        try:
+            import config
+            val = getattr(config, key, default)
+        except ImportError:
+            val = default
 
+    # Clean value (remove quotes and whitespace)
+    if isinstance(val, str):
+        val = val.strip().strip('"').strip("'")
+    return val
+
+def _connection_kwargs():
+    port_raw = get_config("DB_PORT", 3306)
+    try:
+        port = int(port_raw)
+    except (ValueError, TypeError):
+        port = 3306
+
+    return dict(
+        host=get_config("DB_HOST"),
+        user=get_config("DB_USER"),
+        password=get_config("DB_PASSWORD"),
+        database=get_config("DB_NAME"),
+        port=port,
+        use_pure=True,  # Better compatibility for some environments
+        ssl_disabled=False # Try to use SSL if available
+        # If your server requires a specific CA file, it must be provided in DB_SSL_CA
+        # ssl_ca=get_config("DB_SSL_CA")
+    )
+
+# --- Connection Pool ---
+# Every request used to open a fresh (TLS) connection. Connections are now kept
+# in a pool; conn.close() hands them back instead of disconnecting.
+_pool = None
+_pool_lock = threading.Lock()
+_mock_announced = False
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size_raw = get_config("DB_POOL_SIZE", 5)
+                try:
+                    size = int(size_raw)
+                except (ValueError, TypeError):
+                    size = 5
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="wallan",
+                    pool_size=size,
+                    **_connection_kwargs()
+                )
+                print(f"✅ CONNECTED to Real MySQL DB: {get_config('DB_HOST')} (pool of {size})", flush=True)
+    return _pool
+
+def get_connection():
     host = get_config("DB_HOST")
     if not host:
-        print("DEBUG: No DB_HOST found, using MOCK database.")
+        global _mock_announced
+        if not _mock_announced:
+            print("DEBUG: No DB_HOST found, using MOCK database (in-memory SQLite).")
+            _mock_announced = True
         return MockConnection()
 
     try:
-        user = get_config("DB_USER")
-        password = get_config("DB_PASSWORD")
-        database = get_config("DB_NAME")
-        port_raw = get_config("DB_PORT", 3306)
-        
         try:
-            port = int(port_raw)
-        except (ValueError, TypeError):
-            port = 3306
-
-        print(f"DEBUG: Attempting REAL DB connection to {host}...", flush=True)
-        
-        # Azure MySQL Flexible Server often requires SSL.
-        # We try to connect. If it fails, we log why.
-        conn = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database,
-            port=port,
-            use_pure=True,  # Better compatibility for some environments
-            ssl_disabled=False # Try to use SSL if available
-            # If your server requires a specific CA file, it must be provided in DB_SSL_CA
-            # ssl_ca=get_config("DB_SSL_CA")
-        )
-        
+            return _get_pool().get_connection()
+        except pooling.PoolError as err:
+            # Pool exhausted under load: fall back to a one-off connection
+            print(f"DEBUG: {err}. Opening a direct connection to {host}...", flush=True)
+
+        conn = mysql.connector.connect(**_connection_kwargs())
         if conn.is_connected():
-            print(f"✅ CONNECTED to Real MySQL DB: {host}", flush=True)
             return conn
         else:
             raise Exception("Connection technically succeeded but is_connected() is False")
 
     except Exception as err:
         print(f"❌ Database connection error: {err}", flush=True)
-        print("Fallback: Using MOCK database to keep app running.", flush=True)
-        return MockConnection()
+        print("Fallback: Using MOCK database to keep app running (nothing is stored).", flush=True)
+        return FallbackConnection()
+
+def pool_health():
+    """Cheap liveness check: borrow a pooled connection (which pings it) and give it back."""
+    if not get_config("DB_HOST"):
+        return {"status": "ok", "connection_mode": "MOCK"}
+
+    try:
+        pool = _get_pool()
+    except Exception as err:
+        return {"status": "error", "connection_mode": "REAL", "error": str(err)}
+
+    try:
+        conn = pool.get_connection()
+        conn.close()
+    except pooling.PoolError:
+        # Every connection is checked out: the database is busy, not down
+        return {"status": "ok", "connection_mode": "REAL", "pool_size": pool.pool_size, "pool_available": 0}
+    except Exception as err:
+        return {"status": "error", "connection_mode": "REAL", "error": str(err)}
+
+    return {
+        "status": "ok",
+        "connection_mode": "REAL",
+        "pool_size": pool.pool_size,
+        "pool_available": pool._cnx_queue.qsize()
+    }
+
+# --- Schema Snapshot Cache ---
+# /db-status and /db-view are polled by uptime monitors. Their results are kept
+# for a TTL and dropped whenever this process changes the schema.
+_cache = {}
+_cache_locks = {}
+_cache_generation = 0
+_cache_lock = threading.Lock() # Guards _cache_locks/_cache_generation only; never held while loading
+
+def cached(key, ttl, loader, cache_if=None):
+    entry = _cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    with _cache_lock:
+        key_lock = _cache_locks.setdefault(key, threading.Lock())
+
+    # Only one thread reloads a key; concurrent callers wait and reuse its result
+    with key_lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        generation = _cache_generation
+        value = loader()
+        with _cache_lock:
+            # Don't store a result that was loaded across an invalidation
+            if generation == _cache_generation and (cache_if is None or cache_if(value)):
+                _cache[key] = (time.monotonic() + ttl, value)
+        return value
+
+def invalidate_schema_cache():
+    global _cache_generation
+    with _cache_lock:
+        _cache_generation += 1
+        _cache.clear()
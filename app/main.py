@@ -1,10 +1,8 @@
 # Force redeploy v1.7.0
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import List, Dict, Any, Annotated
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Annotated
 import os
 import cv2
 import numpy as np
@@ -16,9 +14,18 @@ from dotenv import load_dotenv
 
 from azure.storage.blob import BlobServiceClient, ContentSettings
 
-from app.database import get_connection
-from app.utils.compare import compare_images as structural_compare
+from app.database import get_connection, cached, invalidate_schema_cache, pool_health
+from app.schemas import Submission
+from app.utils.admission import AdmissionControlMiddleware, DEFAULT_LIMITS, DEFAULT_MAX_UPLOAD_BYTES, parse_limits
+from app.utils import fastjson
+from app.utils.align import content_hash
+from app.utils.compare import compare_with_defects, diff_images, label_for
+from app.utils.image_cache import DecodedImageCache
 from app.utils.otp import generate_otp, verify_otp
+from app.utils.pagination import DEFAULT_PAGE_SIZE, open_page
+from app.utils.static_files import CachedStaticFiles
+from app.utils.storage import FILES_PATH, IDEAL_PATH, read_stored_image
+from app.utils.thumbnails import derivative_urls, schedule_derivatives
 
 load_dotenv()
 
@@ -119,6 +126,16 @@ async def demo_login_endpoint():
     return {"message": "Demo login successful", "user_id": user_id}
 
 
+# Per-route concurrency/queue limits and an upload size cap, so CPU-heavy routes
+# cannot starve the cheap ones. Added before CORS so rejections still carry CORS headers.
+app.add_middleware(
+    AdmissionControlMiddleware,
+    limits=parse_limits(os.getenv("ADMISSION_LIMITS", DEFAULT_LIMITS)),
+    max_body_bytes=int(os.getenv("MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+    retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -176,12 +193,9 @@ FILE_TYPE_LIST = [
     "png", "jpg", "jpeg" # Allow extensions as types if frontend sends them
 ]
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKEND_ROOT = os.path.dirname(BASE_DIR)
-FILES_PATH = os.path.join(BACKEND_ROOT, "files")
 os.makedirs(FILES_PATH, exist_ok=True)
 
-app.mount("/files", StaticFiles(directory=FILES_PATH), name="files")
+app.mount("/files", CachedStaticFiles(directory=FILES_PATH), name="files")
 
 def upload_file_to_azure(file_type: str, file: UploadFile) -> str:
     if not blob_service_client:
@@ -274,14 +288,39 @@ async def start_inspection(user_id: str = Form(...)):
         
     return {"inspection_id": inspection_id}
 
+_submission_tables_ready = False
+
+def ensure_submission_tables(cur):
+    # One row per analysis result so damage statistics can be aggregated in SQL
+    global _submission_tables_ready
+    if _submission_tables_ready:
+        return
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS submission_results (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            submission_id BIGINT NOT NULL,
+            report_id BIGINT,
+            user_id VARCHAR(255),
+            position SMALLINT,
+            damage_type VARCHAR(100),
+            severity VARCHAR(20),
+            severity_score SMALLINT,
+            has_damage TINYINT
+        )
+    """)
+    try:
+        cur.execute("CREATE INDEX idx_submission_results_user ON submission_results (user_id, damage_type)")
+        invalidate_schema_cache()
+    except: pass # Index already exists
+    _submission_tables_ready = True
+
 @app.post("/submissions")
-async def submit_photos(submission: Dict[str, Any]):
-    print(f"Received submission: {submission}")
-    import json
+async def submit_photos(submission: Submission):
+    print(f"Received submission: userId={submission.userId}, carModel={submission.carModel}, results={len(submission.results)}")
     
-    user_id = submission.get("userId")
-    raw_car_model = submission.get("carModel") or "Unknown Vehicle"
-    analysis_results = submission.get("analysisResults") or []
+    user_id = submission.userId
+    raw_car_model = submission.carModel or "Unknown Vehicle"
+    analysis_results = submission.results
     
     # Split car model into brand and model if possible
     brand = "Unknown"
@@ -292,26 +331,17 @@ async def submit_photos(submission: Dict[str, Any]):
         model = parts[1]
     
     # Derive Summary and Score from AI results
-    summary_parts = []
-    total_score = 0
-    damage_count = 0
-    
-    severity_map = {"none": 0, "low": 25, "medium": 50, "high": 75, "critical": 100}
-    
-    for res in analysis_results:
-        summary_parts.append(f"{res.get('damageType', 'N/A')}: {res.get('description', '')}")
-        sev = res.get('severity', 'none').lower()
-        score = severity_map.get(sev, 0)
-        total_score += score
-        if res.get('hasDamage'):
-            damage_count += 1
-            
-    final_summary = " | ".join(summary_parts)
-    avg_score = total_score / len(analysis_results) if analysis_results else 0
+    final_summary = " | ".join(f"{res.damageType}: {res.description}" for res in analysis_results)
+    severity_scores = submission.severity_scores()
+    damage_flags = submission.damage_flags()
+    avg_score = sum(severity_scores) / len(severity_scores) if severity_scores else 0
     
     conn = get_connection()
     cur = conn.cursor()
     try:
+        # DDL commits implicitly in MySQL, so it must run before the transaction starts
+        ensure_submission_tables(cur)
+
         # 1. Update/Create Car record
         cur.execute("SELECT id FROM cars WHERE brand = %s AND model = %s AND userId = %s", (brand, model, user_id))
         car_row = cur.fetchone()
@@ -335,11 +365,27 @@ async def submit_photos(submission: Dict[str, Any]):
         # 3. Save to backup 'submissions' table
         cur.execute(
             "INSERT INTO submissions (user_id, car_model, analysis_json) VALUES (%s, %s, %s)",
-            (str(user_id), raw_car_model, json.dumps(analysis_results))
+            (str(user_id), raw_car_model, fastjson.dumps([res.model_dump(exclude_unset=True) for res in analysis_results]))
         )
+        submission_id = cur.lastrowid
+
+        # 4. Columnar copy of the results
+        if analysis_results:
+            cur.executemany(
+                """
+                INSERT INTO submission_results
+                (submission_id, report_id, user_id, position, damage_type, severity, severity_score, has_damage)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (submission_id, report_id, str(user_id), position, res.damageType,
+                     res.severity_key, severity_scores[position], int(damage_flags[position]))
+                    for position, res in enumerate(analysis_results)
+                ]
+            )
         
         conn.commit()
-        return {"status": "success", "submission_id": cur.lastrowid, "report_id": report_id, "car_id": car_id}
+        return {"status": "success", "submission_id": submission_id, "report_id": report_id, "car_id": car_id}
     except Exception as e:
         print(f"Error saving submission: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -347,6 +393,39 @@ async def submit_photos(submission: Dict[str, Any]):
         cur.close()
         conn.close()
 
+@app.get("/users/{user_id}/damage-stats")
+async def damage_stats(user_id: str):
+    conn = get_connection()
+    if hasattr(conn, 'is_fallback'):
+        conn.close()
+        return {"user_id": user_id, "damage_types": []}
+
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(
+            """
+            SELECT damage_type,
+                   COUNT(*) AS results,
+                   SUM(has_damage) AS damaged,
+                   AVG(severity_score) AS avg_severity,
+                   MAX(severity_score) AS max_severity
+            FROM submission_results
+            WHERE user_id = %s
+            GROUP BY damage_type
+            ORDER BY damaged DESC
+            """,
+            (user_id,)
+        )
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"DB Error reading damage stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        cur.close()
+        conn.close()
+
+    return {"user_id": user_id, "damage_types": rows}
+
 @app.delete("/photos/{photo_id}")
 async def delete_photo(photo_id: str):
     print(f"Requested delete photo: {photo_id}")
@@ -354,9 +433,41 @@ async def delete_photo(photo_id: str):
     return {"status": "success"}
 
 UPLOAD_BASE = os.path.join(FILES_PATH, "inspections")
-IDEAL_PATH = os.path.join(FILES_PATH, "ideal.png")
 os.makedirs(UPLOAD_BASE, exist_ok=True)
 
+_image_columns_ready = False
+
+def ensure_image_columns(conn, cur):
+    # Columns added after inspection_images was first created. Once they exist
+    # every ALTER fails (after an implicit commit), so only try once per process.
+    global _image_columns_ready
+    if _image_columns_ready or hasattr(conn, 'is_fallback'):
+        return
+    for column, column_type in [("thumb_path", "VARCHAR(500)"), ("medium_path", "VARCHAR(500)"), ("defect_boxes", "TEXT")]:
+        try:
+            cur.execute(f"ALTER TABLE inspection_images ADD COLUMN {column} {column_type}")
+            invalidate_schema_cache()
+        except: pass # Column already exists
+    _image_columns_ready = True
+
+def record_derivatives(image_id, urls):
+    # Runs on a thumbnail worker thread once the derivatives exist
+    if not image_id:
+        return
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE inspection_images SET thumb_path = %s, medium_path = %s WHERE id = %s",
+            (urls["thumb"], urls["medium"], image_id)
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"DB Error recording derivatives for image {image_id}: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
 @app.post("/inspection/upload-image")
 async def upload_image(
     inspection_id: str = Form(...),
@@ -402,6 +513,7 @@ async def upload_image(
 
 
     azure_url = None
+    upload_derivative = None
     if blob_service_client:
         try:
             # Ensure container exists
@@ -443,6 +555,14 @@ async def upload_image(
             
             azure_url = f"https://{blob_service_client.account_name}.blob.core.windows.net/{container_name}/{blob_name}"
             print(f"DEBUG: Azure Upload SUCCESS: {azure_url}")
+
+            # Derivatives are uploaded next to the original blob
+            def upload_derivative(name, data):
+                container_client.get_blob_client(f"inspections/{inspection_id}/{name}").upload_blob(
+                    data,
+                    overwrite=True,
+                    content_settings=ContentSettings(content_type="image/webp")
+                )
             # --- ASYNC AZURE LOGIC END ---
             
         except Exception as e:
@@ -460,9 +580,10 @@ async def upload_image(
 
     similarity = 0.0
     label = "good"
+    defect_boxes = []
     if local_image_path and os.path.exists(IDEAL_PATH) and os.path.exists(str(local_image_path)):
-        similarity = structural_compare(IDEAL_PATH, str(local_image_path))
-        label = "defective" if similarity < 0.9 else "good"
+        similarity, defect_boxes = await asyncio.to_thread(compare_with_defects, IDEAL_PATH, str(local_image_path))
+        label = label_for(similarity)
 
     conn = get_connection()
     cur = conn.cursor()
@@ -479,6 +600,9 @@ async def upload_image(
                 image_path VARCHAR(500),
                 similarity FLOAT,
                 label VARCHAR(20),
+                thumb_path VARCHAR(500),
+                medium_path VARCHAR(500),
+                defect_boxes TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -488,6 +612,7 @@ async def upload_image(
             cur.execute("ALTER TABLE inspection_images MODIFY COLUMN inspection_id BIGINT")
         except:
             pass
+        ensure_image_columns(conn, cur)
         cur.execute("SET FOREIGN_KEY_CHECKS = 1")
     except:
         pass
@@ -496,11 +621,13 @@ async def upload_image(
     cur.execute(
         """
         INSERT INTO inspection_images
-        (inspection_id, image_type, image_path, similarity, label)
-        VALUES (%s,%s,%s,%s,%s)
+        (inspection_id, image_type, image_path, similarity, label, defect_boxes)
+        VALUES (%s,%s,%s,%s,%s,%s)
         """,
-        (inspection_id, clean_image_type, azure_url, similarity, label)
+        (inspection_id, clean_image_type, azure_url, similarity, label,
+         fastjson.dumps(defect_boxes)) # Compact [[x, y, w, h], ...]
     )
+    image_id = cur.lastrowid
 
     # --- NEW: Populate Legacy reportphotos table ---
     try:
@@ -509,6 +636,8 @@ async def upload_image(
         angle_row = cur.fetchone()
         angle_id = angle_row[0] if angle_row else 1 # Fallback to first angle
         
+        # reportId gets the inspection id: the report itself is only created
+        # later by /submissions, which does not know the inspection.
         cur.execute(
             """
             INSERT INTO reportphotos (reportId, angleId, photoUrl, aiAnalysis)
@@ -524,11 +653,29 @@ async def upload_image(
     cur.close()
     conn.close()
 
+    # Thumbnails/previews are generated in the background. thumb_path/medium_path
+    # are only filled in once they have actually been written.
+    derivatives = {"thumb": None, "medium": None}
+    if local_image_path or upload_derivative:
+        urls = derivative_urls(azure_url)
+        scheduled = schedule_derivatives(
+            content,
+            local_image_path.parent if local_image_path else None,
+            final_filename,
+            upload_derivative,
+            lambda written: record_derivatives(image_id, urls)
+        )
+        if scheduled:
+            derivatives = urls
+
     return {
         "image_type": clean_image_type,
         "similarity": similarity,
         "label": label,
-        "url": azure_url
+        "defect_boxes": [{"x": x, "y": y, "w": w, "h": h} for x, y, w, h in defect_boxes],
+        "url": azure_url,
+        "thumb_url": derivatives["thumb"],
+        "medium_url": derivatives["medium"]
     }
 
 @app.post("/compare-images")
@@ -539,44 +686,155 @@ async def compare_images_endpoint(
     old_bytes = await old_image.read()
     new_bytes = await new_image.read()
 
-    old_img = cv2.imdecode(np.frombuffer(old_bytes, np.uint8), cv2.IMREAD_COLOR)
-    new_img = cv2.imdecode(np.frombuffer(new_bytes, np.uint8), cv2.IMREAD_COLOR)
+    # Decoding, diffing and encoding all run off the event loop so cheap routes stay responsive
+    def run_comparison():
+        old_img = cv2.imdecode(np.frombuffer(old_bytes, np.uint8), cv2.IMREAD_COLOR)
+        new_img = cv2.imdecode(np.frombuffer(new_bytes, np.uint8), cv2.IMREAD_COLOR)
 
-    if old_img is None or new_img is None:
+        if old_img is None or new_img is None:
+            return None
+
+        # Align the new photo onto the old one before diffing (keypoints cached by content hash)
+        mse, diff_percentage, highlight = diff_images(old_img, new_img, content_hash(old_bytes), content_hash(new_bytes))
+        _, encoded = cv2.imencode(".jpg", highlight)
+        return mse, diff_percentage, base64.b64encode(encoded.tobytes()).decode()
+
+    result = await asyncio.to_thread(run_comparison)
+    if result is None:
         raise HTTPException(status_code=400, detail="Invalid image")
+    mse, diff_percentage, diff_base64 = result
 
-    if old_img.shape != new_img.shape:
-        new_img = cv2.resize(new_img, (old_img.shape[1], old_img.shape[0]))
+    return {
+        "mse": mse,
+        "diff_percentage": diff_percentage,
+        "diff_image_base64": diff_base64
+    }
 
-    diff = cv2.absdiff(old_img, new_img)
-    gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 30, 255, cv2.THRESH_BINARY)
+# --- Before/after comparison of stored inspections ---
 
-    mse = float(np.mean((old_img - new_img) ** 2))
-    diff_percentage = float((np.sum(thresh > 0) / thresh.size) * 100)
+# Globals are looked up per call so bench/endpoints.py can swap in its fakes
+image_cache = DecodedImageCache(
+    lambda url: read_stored_image(url, blob_service_client, AZURE_CONTAINER_NAME, FILES_PATH),
+    int(os.getenv("IMAGE_CACHE_MB", "256")) * 1024 * 1024
+)
 
-    highlight = new_img.copy()
-    highlight[thresh > 0] = [0, 0, 255]
+def resolve_inspection_images(cur, inspection_id):
+    cur.execute(
+        "SELECT id, image_type, image_path FROM inspection_images WHERE inspection_id = %s ORDER BY id",
+        (inspection_id,)
+    )
+    # Latest upload per angle wins. The row id versions the URL, since a
+    # re-upload overwrites the same file name.
+    return {image_type.lower(): (path, image_id) for image_id, image_type, path in cur.fetchall()}
 
-    _, encoded = cv2.imencode(".jpg", highlight)
-    diff_base64 = base64.b64encode(encoded.tobytes()).decode()
+def compare_stored_angle(old_image, new_image, include_images):
+    (old_url, old_version), (new_url, new_version) = old_image, new_image
+    try:
+        old_img, old_key = image_cache.get(old_url, old_version)
+        new_img, new_key = image_cache.get(new_url, new_version)
+    except Exception as e:
+        print(f"ERROR: Could not load comparison images: {e}")
+        return {"error": str(e), "old_url": old_url, "new_url": new_url}
+    if old_img is None or new_img is None:
+        return {"error": "Image not found", "old_url": old_url, "new_url": new_url}
+
+    mse, diff_percentage, highlight = diff_images(old_img, new_img, old_key, new_key)
+    result = {"mse": mse, "diff_percentage": diff_percentage, "old_url": old_url, "new_url": new_url}
+    if include_images:
+        _, encoded = cv2.imencode(".jpg", highlight)
+        result["diff_image_base64"] = base64.b64encode(encoded.tobytes()).decode()
+    return result
+
+@app.get("/inspections/compare")
+async def compare_inspections(old_inspection_id: int, new_inspection_id: int, include_images: bool = False):
+    # Photos can only be compared per inspection: reportphotos.reportId holds the
+    # inspection id (see upload_image), and nothing links a report stage to one.
+    def resolve():
+        conn = get_connection()
+        if hasattr(conn, 'is_fallback'):
+            conn.close()
+            return {}, {}
+        cur = conn.cursor()
+        try:
+            return resolve_inspection_images(cur, old_inspection_id), resolve_inspection_images(cur, new_inspection_id)
+        finally:
+            cur.close()
+            conn.close()
+
+    try:
+        old_images, new_images = await asyncio.to_thread(resolve)
+    except Exception as e:
+        print(f"DB Error resolving comparison images: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    angles = sorted(old_images.keys() & new_images.keys())
+    results = await asyncio.gather(*[
+        asyncio.to_thread(compare_stored_angle, old_images[angle], new_images[angle], include_images)
+        for angle in angles
+    ])
 
     return {
-        "mse": mse,
-        "diff_percentage": diff_percentage,
-        "diff_image_base64": diff_base64
+        "angles": dict(zip(angles, results)),
+        "missing": sorted(old_images.keys() ^ new_images.keys())
     }
 
-@app.get("/db-status")
-async def db_status():
+# --- Paginated read APIs ---
+# All list endpoints use keyset pagination: pass the returned `next_cursor`
+# back as `cursor` to get the next (older) page.
+
+INSPECTION_COLUMNS = ["id", "user_id", "created_at"]
+INSPECTION_IMAGE_COLUMNS = [
+    "id", "inspection_id", "image_type", "image_path", "thumb_path", "medium_path",
+    "similarity", "label", "defect_boxes", "created_at"
+]
+CAR_COLUMNS = ["id", "userId", "brand", "model", "carType"]
+REPORT_COLUMNS = ["id", "carId", "reportStage", "damageScore", "summary", "createdAt"]
+
+async def keyset_response(table, columns, where, where_params, cursor, limit, json_columns=()):
+    try:
+        body = await asyncio.to_thread(open_page, table, columns, where, where_params, cursor, limit, json_columns)
+    except Exception as e:
+        print(f"DB Error reading {table}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return StreamingResponse(body, media_type="application/json")
+
+@app.get("/users/{user_id}/inspections")
+async def list_user_inspections(user_id: str, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await keyset_response("inspections", INSPECTION_COLUMNS, "user_id = %s", (user_id,), cursor, limit)
+
+@app.get("/inspections/{inspection_id}/images")
+async def list_inspection_images(inspection_id: int, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await keyset_response(
+        "inspection_images", INSPECTION_IMAGE_COLUMNS, "inspection_id = %s", (inspection_id,), cursor, limit,
+        json_columns=("defect_boxes",)
+    )
+
+@app.get("/users/{user_id}/cars")
+async def list_user_cars(user_id: str, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await keyset_response("cars", CAR_COLUMNS, "userId = %s", (user_id,), cursor, limit)
+
+@app.get("/cars/{car_id}/reports")
+async def list_car_reports(car_id: int, cursor: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await keyset_response("reports", REPORT_COLUMNS, "carId = %s", (car_id,), cursor, limit)
+
+DB_STATUS_TTL = int(os.getenv("DB_STATUS_TTL", "300"))
+DB_VIEW_TTL = int(os.getenv("DB_VIEW_TTL", "15"))
+
+def is_healthy_snapshot(status):
+    return status["connection_mode"] == "REAL" and not status["error"]
+
+def load_schema_snapshot():
     conn = get_connection()
     status = {
         "connection_mode": "MOCK" if hasattr(conn, 'is_mock') else "REAL",
         "tables": {},
-        "error": None
+        "error": None,
+        "snapshot_at": int(time.time())
     }
     
-    if status["connection_mode"] == "REAL":
+    if hasattr(conn, 'is_fallback'):
+        status["error"] = "Database unreachable"
+    else:
         try:
             cur = conn.cursor(dictionary=True)
             cur.execute("SHOW TABLES")
@@ -593,11 +851,11 @@ async def db_status():
     conn.close()
     return status
 
-@app.get("/db-view")
-async def db_view():
+def load_db_view():
     conn = get_connection()
     data = {}
-    if hasattr(conn, 'is_mock'):
+    if hasattr(conn, 'is_fallback'):
+        conn.close()
         return {"mode": "MOCK", "data": "No real data in mock mode"}
     
     try:
@@ -615,6 +873,30 @@ async def db_view():
         conn.close()
     return data
 
+@app.get("/health")
+async def health():
+    # Liveness probe for uptime monitors: only checks the connection pool
+    status = await asyncio.to_thread(pool_health)
+    if status["status"] != "ok":
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.get("/db-status")
+async def db_status(refresh: bool = False):
+    # Schema introspection is cached for DB_STATUS_TTL seconds; ?refresh=true forces a reload
+    if refresh:
+        invalidate_schema_cache()
+    return await asyncio.to_thread(cached, "db-status", DB_STATUS_TTL, load_schema_snapshot, is_healthy_snapshot)
+
+@app.get("/db-view")
+async def db_view(refresh: bool = False):
+    if refresh:
+        invalidate_schema_cache()
+    return await asyncio.to_thread(
+        cached, "db-view", DB_VIEW_TTL, load_db_view,
+        lambda data: "error" not in data and "mode" not in data
+    )
+
 @app.get("/")
 def root():
     return {"status": "backend running", "version": "1.7.0"}
\ No newline at end of file
@@ -0,0 +1,38 @@
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+SEVERITY_SCORES = {"none": 0, "low": 25, "medium": 50, "high": 75, "critical": 100}
+
+
+class AnalysisResult(BaseModel):
+    # The app sends extra per-angle fields (angle, confidence, ...); keep them
+    # so the raw analysis_json blob stays lossless.
+    model_config = ConfigDict(extra="allow")
+
+    damageType: Optional[str] = "N/A"
+    description: Optional[str] = ""
+    severity: Optional[str] = "none"
+    hasDamage: Optional[bool] = False
+
+    @property
+    def severity_key(self) -> str:
+        return (self.severity or "none").lower()
+
+
+class Submission(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    userId: Union[int, str, None] = None
+    carModel: Optional[str] = None
+    analysisResults: Optional[List[AnalysisResult]] = None
+
+    @property
+    def results(self) -> List[AnalysisResult]:
+        return self.analysisResults or []
+
+    def severity_scores(self) -> List[int]:
+        return [SEVERITY_SCORES.get(r.severity_key, 0) for r in self.results]
+
+    def damage_flags(self) -> List[bool]:
+        return [bool(r.hasDamage) for r in self.results]
@@ -0,0 +1,151 @@
+import asyncio
+import os
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# Used when ADMISSION_LIMITS is not set. CPU-bound OpenCV/SSIM routes get one
+# slot per core; /upload mostly waits on disk and blob I/O.
+_cpus = os.cpu_count() or 2
+DEFAULT_LIMITS = (
+    f"/compare-images={_cpus}:{_cpus * 2},"
+    f"/inspection/upload-image={_cpus}:{_cpus * 2},"
+    f"/inspections/compare={_cpus}:{_cpus * 2},"
+    "/upload=8:32"
+)
+DEFAULT_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+
+class RouteLimit:
+    """At most `max_concurrent` requests in flight; at most `max_queue` more waiting."""
+
+    def __init__(self, prefix: str, max_concurrent: int, max_queue: int):
+        self.prefix = prefix
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._slots = None
+
+    @property
+    def slots(self):
+        # Created lazily so the semaphore binds to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+def parse_limits(spec: str):
+    """Parse "/route=concurrency:queue,/other=2:4" into RouteLimit objects."""
+    limits = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            prefix, values = item.split("=", 1)
+            concurrent, _, queue = values.partition(":")
+            limits.append(RouteLimit(prefix.strip(), int(concurrent), int(queue or 0)))
+        except ValueError:
+            print(f"WARNING: Ignoring invalid admission limit '{item}'")
+    # Longest prefix wins when routes overlap
+    return sorted(limits, key=lambda limit: -len(limit.prefix))
+
+
+class BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it and answers 413
+    def __init__(self, max_body_bytes: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds {max_body_bytes} bytes")
+
+
+class AdmissionControlMiddleware:
+    """Per-route concurrency/queue limits and a request body size cap.
+
+    Requests beyond a route's queue, or that wait longer than `queue_timeout`,
+    are shed with 503 + Retry-After before any of their body is read. Bodies
+    over `max_body_bytes` get 413, checked against Content-Length up front and
+    counted while streaming for chunked uploads. Limits are per worker process.
+    """
+
+    def __init__(self, app, limits=None, max_body_bytes=DEFAULT_MAX_UPLOAD_BYTES, queue_timeout=10.0, retry_after=5):
+        self.app = app
+        self.limits = limits or []
+        self.max_body_bytes = max_body_bytes
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    def _reject(self, status_code: int, detail: str):
+        headers = {"Retry-After": str(self.retry_after)} if status_code == 503 else None
+        return JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if self.max_body_bytes and content_length and content_length.isdigit() \
+                and int(content_length) > self.max_body_bytes:
+            await self._reject(413, f"Request body exceeds {self.max_body_bytes} bytes")(scope, receive, send)
+            return
+
+        limit = next((candidate for candidate in self.limits if candidate.matches(scope["path"])), None)
+        if limit is None:
+            await self._call_app(scope, receive, send)
+            return
+
+        if limit.active + limit.waiting >= limit.max_concurrent + limit.max_queue:
+            await self._reject(503, "Server busy, retry later")(scope, receive, send)
+            return
+
+        if limit.slots.locked():
+            limit.waiting += 1
+            try:
+                await asyncio.wait_for(limit.slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self._reject(503, "Server busy, retry later")(scope, receive, send)
+                return
+            finally:
+                limit.waiting -= 1
+        else:
+            await limit.slots.acquire() # Free slot: returns without yielding
+
+        limit.active += 1
+        try:
+            await self._call_app(scope, receive, send)
+        finally:
+            limit.active -= 1
+            limit.slots.release()
+
+    async def _call_app(self, scope, receive, send):
+        if not self.max_body_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise BodyTooLarge(self.max_body_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            if not response_started:
+                await self._reject(413, f"Request body exceeds {self.max_body_bytes} bytes")(scope, receive, send)
@@ -0,0 +1,140 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Keypoints are detected on a downscaled copy; the homography is rescaled to full size.
+ALIGN_MAX_EDGE = 800
+ORB_FEATURES = 2000
+RATIO_TEST = 0.75
+MIN_INLIERS = 15
+# Reject homographies that shrink/grow the image more than this (bad matches)
+MAX_SCALE_CHANGE = 4.0
+# Reject alignments where the photo covers less than this fraction of the
+# reference frame: either a wrong homography or a close-up of one part.
+MIN_COVERAGE = 0.5
+FEATURE_CACHE_SIZE = 256
+
+_features = OrderedDict()
+_features_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _orb_detector():
+    # ORB instances are not documented as thread-safe; keep one per thread
+    if not hasattr(_thread_state, "orb"):
+        _thread_state.orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    return _thread_state.orb
+
+
+def _compute_features(gray):
+    h, w = gray.shape[:2]
+    scale = min(1.0, ALIGN_MAX_EDGE / float(max(h, w)))
+    small = gray if scale == 1.0 else cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    keypoints, descriptors = _orb_detector().detectAndCompute(small, None)
+    if descriptors is None or not keypoints:
+        return np.empty((0, 2), np.float32), None
+
+    # Store points in full-resolution pixel coordinates
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32) / scale
+    return points, descriptors
+
+
+def image_features(gray, key=None):
+    """ORB keypoints (Nx2, full-res pixels) and descriptors, cached by content hash `key`."""
+    if key is None:
+        return _compute_features(gray)
+
+    with _features_lock:
+        cached = _features.get(key)
+        if cached is not None:
+            _features.move_to_end(key)
+            return cached
+
+    features = _compute_features(gray)
+    with _features_lock:
+        _features[key] = features
+        while len(_features) > FEATURE_CACHE_SIZE:
+            _features.popitem(last=False)
+    return features
+
+
+def estimate_homography(reference_gray, reference_key, image_gray, image_key):
+    """Homography mapping `image` pixels onto `reference` pixels, or None if unreliable."""
+    ref_points, ref_desc = image_features(reference_gray, reference_key)
+    img_points, img_desc = image_features(image_gray, image_key)
+    if ref_desc is None or img_desc is None or len(ref_points) < MIN_INLIERS or len(img_points) < MIN_INLIERS:
+        return None
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pairs = matcher.knnMatch(img_desc, ref_desc, k=2)
+    good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < RATIO_TEST * p[1].distance]
+    if len(good) < MIN_INLIERS:
+        return None
+
+    src = img_points[[m.queryIdx for m in good]].reshape(-1, 1, 2)
+    dst = ref_points[[m.trainIdx for m in good]].reshape(-1, 1, 2)
+    H, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    if H is None or inliers is None or int(inliers.sum()) < MIN_INLIERS:
+        return None
+
+    det = float(np.linalg.det(H[:2, :2]))
+    if not (1.0 / MAX_SCALE_CHANGE <= det <= MAX_SCALE_CHANGE):
+        return None
+    return H
+
+
+def align_to_reference(reference, reference_key, image, image_key):
+    """Warp `image` into the frame of `reference`.
+
+    Returns (warped, valid_mask, H). Pixels outside the warped image are
+    filled from the reference to avoid artificial edges; callers must score
+    only the `valid` pixels. Falls back to a plain resize (H=None) when no
+    reliable homography is found or the photo covers less than MIN_COVERAGE
+    of the frame.
+    """
+    ref_gray = reference if reference.ndim == 2 else cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+    img_gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    size = (reference.shape[1], reference.shape[0])
+
+    H = estimate_homography(ref_gray, reference_key, img_gray, image_key)
+    if H is None:
+        return cv2.resize(image, size), np.ones(reference.shape[:2], bool), None
+
+    valid = cv2.warpPerspective(np.full(image.shape[:2], 255, np.uint8), H, size) > 0
+    if valid.mean() < MIN_COVERAGE:
+        return cv2.resize(image, size), np.ones(reference.shape[:2], bool), None
+
+    warped = cv2.warpPerspective(image, H, size)
+    warped[~valid] = reference[~valid]
+    return warped, valid, H
+
+
+def map_boxes_back(boxes, H, image_size, reference_size):
+    """Map [x, y, w, h] boxes from reference pixels back to the original image's pixels."""
+    if not boxes:
+        return []
+    boxes = np.asarray(boxes, dtype=np.float32)
+
+    if H is None:
+        sx = image_size[0] / float(reference_size[0])
+        sy = image_size[1] / float(reference_size[1])
+        boxes = boxes * np.array([sx, sy, sx, sy], np.float32)
+        return np.rint(boxes).astype(int).tolist()
+
+    x, y, w, h = boxes.T
+    corners = np.stack([
+        np.stack([x, y], 1), np.stack([x + w, y], 1),
+        np.stack([x, y + h], 1), np.stack([x + w, y + h], 1)
+    ], 1).reshape(-1, 1, 2)
+    mapped = cv2.perspectiveTransform(corners, np.linalg.inv(H)).reshape(-1, 4, 2)
+    lo = np.clip(mapped.min(axis=1), 0, [image_size[0], image_size[1]])
+    hi = np.clip(mapped.max(axis=1), 0, [image_size[0], image_size[1]])
+    return np.rint(np.hstack([lo, hi - lo])).astype(int).tolist()
@@ -1,14 +1,118 @@
+import os
+from pathlib import Path
+
 import cv2
+import numpy as np
 from skimage.metrics import structural_similarity as ssim
 
-def compare_images(ideal_path, test_path):
-    ideal = cv2.imread(ideal_path, cv2.IMREAD_GRAYSCALE)
-    test = cv2.imread(test_path, cv2.IMREAD_GRAYSCALE)
+from app.utils.align import align_to_reference, content_hash, map_boxes_back
+
+# Defect localization works on a downscaled copy of the SSIM diff map.
+DEFECT_MASK_MAX_EDGE = 256
+# Diff values (0-255) below this are treated as changed pixels (same as compare/logic.py)
+DEFECT_DIFF_THRESHOLD = 160
+# Boxes smaller than this fraction of the image are noise (500px on a 600x600 image)
+MIN_DEFECT_AREA_FRACTION = 500 / (600 * 600)
+MAX_DEFECT_BOXES = 50
+# Uploads scoring below this SSIM against the ideal image are labelled "defective"
+DEFECT_THRESHOLD = float(os.getenv("DEFECT_THRESHOLD", "0.9"))
+# skimage's default SSIM window for non-Gaussian weighting
+SSIM_WINDOW = 7
+
+def load_gray(path):
+    """Grayscale image plus the content hash used to cache its keypoints."""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None, None
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    return img, content_hash(data)
+
+def extract_defect_boxes(diff, out_size):
+    """Bounding boxes [x, y, w, h] of low-similarity regions of an SSIM diff map.
+
+    `diff` is the full SSIM map (-1..1); boxes are scaled from the mask to `out_size` (w, h).
+    """
+    h, w = diff.shape[:2]
+    scale = min(1.0, DEFECT_MASK_MAX_EDGE / float(max(h, w)))
+    small = np.clip(diff * 255, 0, 255).astype(np.uint8)
+    if scale < 1.0:
+        small = cv2.resize(small, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    mask = (small < DEFECT_DIFF_THRESHOLD).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return []
+
+    # Row 0 is the background; columns are x, y, w, h, pixel area
+    boxes = stats[1:, :4].astype(np.float64)
+    areas = boxes[:, 2] * boxes[:, 3]
+    keep = areas >= MIN_DEFECT_AREA_FRACTION * mask.shape[0] * mask.shape[1]
+    boxes, areas = boxes[keep], areas[keep]
+    boxes = boxes[np.argsort(-areas)[:MAX_DEFECT_BOXES]]
+
+    sx = out_size[0] / float(mask.shape[1])
+    sy = out_size[1] / float(mask.shape[0])
+    boxes *= np.array([sx, sy, sx, sy])
+    return np.rint(boxes).astype(int).tolist()
+
+def masked_ssim(diff, valid):
+    """Mean of an SSIM map over pixels whose whole window lies on the photo.
+
+    Matches skimage's own score (which drops a border of half a window) when
+    every pixel is valid.
+    """
+    kernel = np.ones((SSIM_WINDOW, SSIM_WINDOW), np.uint8)
+    inner = cv2.erode(valid.astype(np.uint8), kernel, borderType=cv2.BORDER_CONSTANT, borderValue=0) > 0
+    return float(diff[inner].mean()) if inner.any() else 0.0
+
+def score_against(ideal, ideal_key, test, test_key):
+    """SSIM score plus defect boxes (in test image pixels) from a single SSIM pass.
+
+    The test image is registered onto the ideal one first so framing
+    differences between phone photos are not scored as damage.
+    """
+    test_size = (test.shape[1], test.shape[0])
+    ideal_size = (ideal.shape[1], ideal.shape[0])
+    aligned, valid, H = align_to_reference(ideal, ideal_key, test, test_key)
+    # Areas the photo doesn't cover are filled from the ideal image; leave them out of the score
+    _, diff = ssim(ideal, aligned, win_size=SSIM_WINDOW, full=True)
+    boxes = extract_defect_boxes(diff, ideal_size)
+    return masked_ssim(diff, valid), map_boxes_back(boxes, H, test_size, ideal_size)
+
+def compare_with_defects(ideal_path, test_path):
+    ideal, ideal_key = load_gray(ideal_path)
+    test, test_key = load_gray(test_path)
 
     if ideal is None or test is None:
-        return 0.0
+        return 0.0, []
+
+    return score_against(ideal, ideal_key, test, test_key)
+
+def label_for(similarity, threshold=None):
+    return "defective" if similarity < (DEFECT_THRESHOLD if threshold is None else threshold) else "good"
+
+def compare_images(ideal_path, test_path):
+    return compare_with_defects(ideal_path, test_path)[0]
+
+def diff_images(old_img, new_img, old_key=None, new_key=None):
+    """Pixel diff of two BGR photos after registering `new_img` onto `old_img`.
+
+    Returns (mse, diff_percentage, highlight) where highlight is the aligned
+    new image with changed pixels painted red.
+    """
+    new_img, valid, _ = align_to_reference(old_img, old_key, new_img, new_key)
+
+    diff = cv2.absdiff(old_img, new_img)
+    gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 30, 255, cv2.THRESH_BINARY)
+    changed = (thresh > 0) & valid
+
+    # Both measured only where the aligned photo covers the old one
+    squared = (old_img.astype(np.float32) - new_img.astype(np.float32)) ** 2
+    mse = float(np.mean(squared[valid]))
+    diff_percentage = float(np.count_nonzero(changed) / np.count_nonzero(valid) * 100)
 
-    # Resize test to ideal size
-    test = cv2.resize(test, (ideal.shape[1], ideal.shape[0]))
-    score, _ = ssim(ideal, test, full=True)
-    return float(score)
+    highlight = new_img.copy()
+    highlight[changed] = [0, 0, 255]
+    return mse, diff_percentage, highlight
@@ -0,0 +1,32 @@
+import datetime
+import decimal
+import json
+
+# orjson is several times faster than the stdlib for the large analysis blobs,
+# but keep working without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def dumps(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
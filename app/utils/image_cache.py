@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.utils.align import content_hash
+
+
+class DecodedImageCache:
+    """LRU of decoded BGR images keyed by stored URL and version, bounded by decoded size.
+
+    `loader(url) -> bytes` fetches the encoded image (local file or blob).
+    Uploads overwrite fixed names, so callers pass a `version` that changes
+    whenever the content behind a URL does (e.g. the image row id).
+    Entries are (image, content_hash) so keypoint caching keeps working.
+    """
+
+    def __init__(self, loader, max_bytes: int):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str, version=None):
+        key = (url, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        data = self.loader(url)
+        if data is None:
+            return None, None
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None, None
+
+        entry = (img, content_hash(data))
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._size += img.nbytes
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._size -= old.nbytes
+        return entry
+
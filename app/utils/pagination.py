@@ -0,0 +1,90 @@
+from app.database import get_connection
+from app.utils.fastjson import dumps, loads
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+FETCH_BATCH = 200
+
+# Keyset reads filter on the leading column(s) and walk `id` descending; the
+# matching composite indexes are created by create_tables.sql (init_db.py).
+
+def clamp_limit(limit) -> int:
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_query(table: str, columns: list, where: str, cursor, limit: int):
+    """Build a `WHERE ... AND id < cursor ORDER BY id DESC` page query.
+
+    One extra row is requested so the caller can tell whether a next page exists.
+    """
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {where}"
+    params = []
+    if cursor is not None:
+        sql += " AND id < %s"
+        params.append(int(cursor))
+    sql += " ORDER BY id DESC LIMIT %s"
+    params.append(limit + 1)
+    return sql, params
+
+
+def open_page(table: str, columns: list, where: str, where_params: tuple, cursor, limit, json_columns=()):
+    """Run a keyset page query and return an iterator of JSON chunks.
+
+    The query is executed eagerly so errors surface before any response is
+    sent; rows are then pulled lazily with fetchmany so large pages are never
+    fully materialised. `id` must be the first column. Columns listed in
+    `json_columns` hold JSON text and are embedded as JSON, not as strings.
+    """
+    limit = clamp_limit(limit)
+    conn = get_connection()
+
+    if hasattr(conn, "is_fallback"):
+        conn.close()
+        return iter(['{"items":[],"next_cursor":null}'])
+
+    sql, params = keyset_query(table, columns, where, cursor, limit)
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, tuple(where_params) + tuple(params))
+    except Exception:
+        cur.close()
+        conn.close()
+        raise
+    return _stream_rows(conn, cur, columns, limit, json_columns)
+
+
+def _stream_rows(conn, cur, columns: list, limit: int, json_columns=()):
+    """Yield `{"items": [...], "next_cursor": id|null}` from an executed cursor."""
+    try:
+        yield '{"items":['
+        sent = 0
+        last_id = None
+        has_more = False
+        while not has_more:
+            rows = cur.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            chunk = []
+            for row in rows:
+                if sent == limit:
+                    has_more = True
+                    break
+                item = dict(zip(columns, row))
+                for column in json_columns:
+                    if item[column]:
+                        item[column] = loads(item[column])
+                chunk.append(dumps(item))
+                last_id = row[0]
+                sent += 1
+            if chunk:
+                yield ("," if sent > len(chunk) else "") + ",".join(chunk)
+        if has_more:
+            cur.fetchall() # Drain the extra row so the connection can be reused
+        yield '],"next_cursor":' + dumps(last_id if has_more else None) + "}"
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,105 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from functools import lru_cache
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# Uploads are named with a millisecond timestamp (see upload_file_to_azure and
+# upload_image), so a given URL never changes content and can be cached forever.
+VERSIONED_NAME = re.compile(r"(^|_)\d{13}(_|\.|$)")
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={int(os.getenv('FILES_MAX_AGE', '31536000'))}, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Precompressed siblings we are willing to serve, in order of preference.
+PRECOMPRESSED = [("br", ".br"), ("gzip", ".gz")]
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    # mtime/size are part of the cache key so a rewritten file is re-hashed.
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_etag(path: str, stat_result: os.stat_result) -> str:
+    return f'"{_content_hash(path, stat_result.st_mtime_ns, stat_result.st_size)}"'
+
+
+def cache_control_for(path: str) -> str:
+    if VERSIONED_NAME.search(os.path.basename(path)):
+        return IMMUTABLE_CACHE_CONTROL
+    return REVALIDATE_CACHE_CONTROL
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with content-hash ETags, long-lived caching and precompressed variants.
+
+    Byte ranges (Range / If-Range) are handled by Starlette's FileResponse.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        # file_response reads and hashes the whole file on an ETag cache miss, so
+        # regular files are looked up and answered off the event loop.
+        if scope["method"] in ("GET", "HEAD"):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except (OSError, ValueError):
+                full_path, stat_result = None, None # The base class turns these into 401/404
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                return await anyio.to_thread.run_sync(self.file_response, full_path, stat_result, scope)
+        return await super().get_response(path, scope)
+
+    def _precompressed(self, full_path: str, request_headers: Headers):
+        if "range" in request_headers:
+            return None
+        accept = request_headers.get("accept-encoding", "")
+        accepted = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            return encoding, full_path + suffix, variant_stat
+        return None
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+
+        headers = {
+            "cache-control": cache_control_for(full_path),
+            "accept-ranges": "bytes",
+            "vary": "Accept-Encoding",
+        }
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+        variant = self._precompressed(full_path, request_headers)
+        if variant:
+            encoding, serve_path, serve_stat = variant
+            headers["content-encoding"] = encoding
+            headers["etag"] = content_etag(serve_path, serve_stat)[:-1] + f'-{encoding}"'
+        else:
+            serve_path, serve_stat = full_path, stat_result
+            headers["etag"] = content_etag(serve_path, serve_stat)
+
+        response = FileResponse(
+            serve_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=serve_stat,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
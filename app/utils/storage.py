@@ -0,0 +1,29 @@
+import os
+from pathlib import Path
+
+# Kept free of app.main so scripts (rescore.py) can read stored images without
+# building the FastAPI app or its Azure client.
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FILES_PATH = os.path.join(BACKEND_ROOT, "files")
+IDEAL_PATH = os.path.join(FILES_PATH, "ideal.png")
+
+
+def read_stored_image(url, blob_service_client=None, container_name="uploads", files_path=FILES_PATH):
+    """Bytes of a stored inspection image, preferring the local copy over blob storage."""
+    if url.startswith("/files/"):
+        local_path = Path(files_path) / url[len("/files/"):]
+    elif ".blob.core.windows.net/" in url:
+        # https://<account>.blob.core.windows.net/<container>/<blob path>
+        blob_path = url.split(".blob.core.windows.net/", 1)[1].split("/", 1)[1]
+        local_path = Path(files_path) / blob_path
+        if not local_path.exists() and blob_path.startswith("inspections/"):
+            local_path = Path("/tmp") / blob_path # Render keeps uploads in /tmp
+        if not local_path.exists():
+            if not blob_service_client:
+                return None
+            container_client = blob_service_client.get_container_client(container_name)
+            return container_client.get_blob_client(blob_path).download_blob().readall()
+    else:
+        return None
+
+    return local_path.read_bytes() if local_path.exists() else None
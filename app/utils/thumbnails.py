@@ -0,0 +1,127 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Longest edge (in px) for each derivative. Grids use "thumb", detail views use "medium".
+DERIVATIVE_SIZES = {
+    "thumb": 320,
+    "medium": 1280,
+}
+WEBP_QUALITY = 80
+
+# OpenCV releases the GIL while decoding/resizing/encoding, so a small thread
+# pool is enough to keep this work off the request path.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("THUMBNAIL_WORKERS", "2")),
+    thread_name_prefix="thumbnails",
+)
+# Every queued job holds the full upload in memory, so cap how many can wait;
+# past that, derivatives are skipped rather than buffered without limit.
+THUMBNAIL_QUEUE = int(os.getenv("THUMBNAIL_QUEUE", "64"))
+_pending = threading.BoundedSemaphore(THUMBNAIL_QUEUE)
+
+
+def derivative_name(filename: str, variant: str) -> str:
+    # front.jpg -> front_thumb.webp
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{variant}.webp"
+
+
+def derivative_names(filename: str) -> dict:
+    return {variant: derivative_name(filename, variant) for variant in DERIVATIVE_SIZES}
+
+
+def derivative_urls(original_url: str) -> dict:
+    # Derivatives live next to the original
+    base, _, filename = original_url.rpartition("/")
+    return {
+        variant: f"{base}/{name}"
+        for variant, name in derivative_names(filename).items()
+    }
+
+
+def _resize_to_fit(img, max_edge: int):
+    h, w = img.shape[:2]
+    scale = max_edge / float(max(h, w))
+    if scale >= 1.0:
+        return img
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def generate_derivatives(content: bytes, folder, filename: str, upload=None) -> dict:
+    """Write resized WebP derivatives of an image next to the original.
+
+    `upload`, if given, is called as upload(name, data) for each derivative so
+    the caller can mirror them to blob storage.
+    """
+    img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not decode image {filename}")
+
+    written = {}
+    # Largest first so every smaller size is resized from an already reduced image.
+    for variant, max_edge in sorted(DERIVATIVE_SIZES.items(), key=lambda kv: -kv[1]):
+        img = _resize_to_fit(img, max_edge)
+        ok, encoded = cv2.imencode(".webp", img, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+        if not ok:
+            raise ValueError(f"Could not encode {variant} for {filename}")
+
+        data = encoded.tobytes()
+        name = derivative_name(filename, variant)
+        if folder is not None:
+            (Path(folder) / name).write_bytes(data)
+        if upload is not None:
+            upload(name, data)
+        written[variant] = name
+
+    return written
+
+
+def _run_job(content: bytes, folder, filename: str, upload, on_success):
+    try:
+        written = generate_derivatives(content, folder, filename, upload)
+        if on_success is not None:
+            on_success(written)
+        return written
+    finally:
+        _pending.release()
+
+
+def _log_result(future):
+    try:
+        written = future.result()
+        print(f"DEBUG: Generated derivatives {list(written.values())}")
+    except Exception as e:
+        print(f"WARNING: Derivative generation failed: {e}")
+
+
+def schedule_derivatives(content: bytes, folder, filename: str, upload=None, on_success=None):
+    """Queue derivative generation on the worker pool and return immediately.
+
+    `on_success(written)` runs on the worker thread once every derivative has
+    been written. Returns None, without queueing anything, when THUMBNAIL_QUEUE
+    jobs are already pending.
+    """
+    if not _pending.acquire(blocking=False):
+        print(f"WARNING: Derivative queue full, skipping derivatives for {filename}")
+        return None
+    try:
+        future = _executor.submit(_run_job, content, folder, filename, upload, on_success)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(_log_result)
+    return future
+
+
+def wait_idle():
+    """Block until every queued derivative job has finished (used by the benchmarks)."""
+    for _ in range(THUMBNAIL_QUEUE):
+        _pending.acquire()
+    for _ in range(THUMBNAIL_QUEUE):
+        _pending.release()
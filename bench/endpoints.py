@@ -0,0 +1,256 @@
+"""Latency/throughput benchmark for the main API endpoints.
+
+Drives the FastAPI app in-process over httpx's ASGI transport. It uses an
+in-memory Azure blob fake and generated fixture car photos. Files go to a
+temporary directory. The database is whatever get_connection() returns: the
+in-memory SQLite mock by default, or a local MySQL if DB_HOST is set. Reports p50/p95/p99
+latency, throughput and RSS per endpoint.
+
+    pip install -r bench/requirements.txt
+    python -m bench.endpoints --requests 200 --concurrency 8 --json bench_results.json
+    python -m bench.endpoints --baseline bench_results.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import httpx
+
+from app.utils import thumbnails
+from bench.fakes import FakeBlobServiceClient, car_photo, encode
+
+OTP_PHONE = "+971 55 842 3197"
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux and bytes on macOS; this is peak, not current
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def setup_app(workdir, admission_limits=""):
+    """Import the app and point its storage at the fakes/temp dir.
+
+    Admission control is configured from ADMISSION_LIMITS at import time. It
+    is off by default here, because shed requests would be timed as fast
+    responses.
+    """
+    os.environ["ADMISSION_LIMITS"] = admission_limits
+    import app.main as main
+
+    files_path = os.path.join(workdir, "files")
+    upload_base = os.path.join(files_path, "inspections")
+    os.makedirs(upload_base, exist_ok=True)
+
+    main.blob_service_client = FakeBlobServiceClient()
+    main.FILES_PATH = files_path
+    main.UPLOAD_BASE = upload_base
+    main.IDEAL_PATH = os.path.join(files_path, "ideal.png")
+    with open(main.IDEAL_PATH, "wb") as f:
+        f.write(encode(car_photo(seed=1), ".png"))
+    return main.app
+
+
+def build_scenarios():
+    old_photo = encode(car_photo(seed=1))
+    new_photo = encode(car_photo(seed=1, shift=(25, -15), dent=True))
+    submission = {
+        "userId": 1,
+        "carModel": "Toyota Camry",
+        "analysisResults": [
+            {"damageType": "scratch", "description": "door", "severity": "low", "hasDamage": True},
+            {"damageType": "dent", "description": "bumper", "severity": "medium", "hasDamage": True},
+            {"damageType": "none", "description": "", "severity": "none", "hasDamage": False},
+        ] * 4,
+    }
+
+    async def login(client, i):
+        await client.post("/auth/request-otp", data={"phone": OTP_PHONE})
+        return await client.post("/auth/verify-otp", data={"phone": OTP_PHONE, "otp": "9755"})
+
+    async def request_otp(client, i):
+        return await client.post("/auth/request-otp", data={"phone": OTP_PHONE})
+
+    async def demo_login(client, i):
+        return await client.post("/auth/demo-login")
+
+    async def start_inspection(client, i):
+        return await client.post("/inspection/start", data={"user_id": "1"})
+
+    async def upload_image(client, i):
+        return await client.post(
+            "/inspection/upload-image",
+            data={"inspection_id": str(1000 + i), "image_type": "front"},
+            files={"file": ("front.jpg", new_photo, "image/jpeg")},
+        )
+
+    async def upload(client, i):
+        return await client.post(
+            "/upload",
+            data={"fileType": "front"},
+            files={"file": (f"front_{i}.jpg", new_photo, "image/jpeg")},
+        )
+
+    async def submissions(client, i):
+        return await client.post("/submissions", json=submission)
+
+    async def compare_images(client, i):
+        return await client.post(
+            "/compare-images",
+            files={
+                "old_image": ("old.jpg", old_photo, "image/jpeg"),
+                "new_image": ("new.jpg", new_photo, "image/jpeg"),
+            },
+        )
+
+    return {
+        "auth/request-otp": request_otp,
+        "auth/login": login,
+        "auth/demo-login": demo_login,
+        "inspection/start": start_inspection,
+        "inspection/upload-image": upload_image,
+        "upload": upload,
+        "submissions": submissions,
+        "compare-images": compare_images,
+    }
+
+
+async def run_scenario(client, fn, requests, concurrency, warmup):
+    for i in range(warmup):
+        await fn(client, -1 - i)
+
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await fn(client, i)
+            # Only successful responses count towards latency/throughput
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": rss_mb() - rss_before,
+    }
+
+
+async def run(args, app, scenarios):
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, fn in scenarios.items():
+            # The app logs every request to stdout; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = await run_scenario(client, fn, args.requests, args.concurrency, args.warmup)
+                # Uploads leave thumbnail work queued; let it finish so it
+                # doesn't eat CPU while the next scenario is timed
+                await asyncio.to_thread(thumbnails.wait_idle)
+            r = results[name]
+            print(
+                f"{name:26s} p50={r['p50_ms']:8.1f}ms p95={r['p95_ms']:8.1f}ms p99={r['p99_ms']:8.1f}ms "
+                f"{r['rps']:8.1f} req/s rss={r['rss_mb']:7.1f}MB ({r['rss_delta_mb']:+.1f}) errors={r['errors']}",
+                flush=True
+            )
+    return results
+
+
+def check_regressions(results, baseline, tolerance):
+    """Endpoints whose errors rose, or whose p95 grew or throughput fell by more than `tolerance` (fraction)."""
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["errors"] > previous.get("errors", 0):
+            failures.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            failures.append(f"{name}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="endpoint names to run (default: all)")
+    parser.add_argument(
+        "--admission-limits", default="",
+        help="ADMISSION_LIMITS for the app, e.g. '/compare-images=2:4' (default: admission control off)"
+    )
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput change (fraction)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="wallan-bench-") as workdir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = setup_app(workdir, args.admission_limits)
+        scenarios = build_scenarios()
+        if args.only:
+            scenarios = {name: fn for name, fn in scenarios.items() if name in args.only}
+        results = asyncio.run(run(args, app, scenarios))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = check_regressions(results, baseline, args.max_regression)
+        if failures:
+            print("Performance regressions:")
+            for failure in failures:
+                print(f"  {failure}")
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
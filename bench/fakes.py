@@ -0,0 +1,112 @@
+"""Local stand-ins used by the benchmarks: an in-memory Azure blob store and fixture car photos."""
+import threading
+
+import cv2
+import numpy as np
+
+
+class _Download:
+    def __init__(self, data):
+        self._data = data
+
+    def readall(self):
+        return self._data
+
+
+class FakeBlobClient:
+    def __init__(self, store, name):
+        self._store = store
+        self.blob_name = name
+
+    def upload_blob(self, data, overwrite=False, content_settings=None):
+        if hasattr(data, "read"):
+            data = data.read()
+        with self._store.lock:
+            if not overwrite and self.blob_name in self._store.blobs:
+                raise ValueError(f"Blob {self.blob_name} already exists")
+            self._store.blobs[self.blob_name] = bytes(data)
+
+    def download_blob(self):
+        return _Download(self._store.blobs[self.blob_name])
+
+
+class FakeContainerClient:
+    def __init__(self):
+        self.blobs = {}
+        self.lock = threading.Lock()
+        self.created = True
+
+    def exists(self):
+        return self.created
+
+    def create_container(self):
+        self.created = True
+
+    def get_blob_client(self, name):
+        return FakeBlobClient(self, name)
+
+
+class FakeBlobServiceClient:
+    """Just enough of azure.storage.blob.BlobServiceClient for app.main."""
+
+    account_name = "benchfake"
+
+    def __init__(self):
+        self._containers = {}
+
+    def get_container_client(self, name):
+        return self._containers.setdefault(name, FakeContainerClient())
+
+
+# Scenes are drawn on a canvas this much larger on every side, so `shift` can
+# pan the camera over the same scene.
+PAN_MARGIN = 64
+
+
+def car_photo(seed: int = 0, size=(1600, 1200), shift=(0, 0), dent=False) -> np.ndarray:
+    """A deterministic synthetic car photo: textured background, body, windows and wheels.
+
+    `shift=(dx, dy)` moves the whole frame (background included) by up to
+    PAN_MARGIN pixels, like a photo taken from a slightly different position.
+    """
+    w, h = size
+    dx, dy = shift
+    if abs(dx) > PAN_MARGIN or abs(dy) > PAN_MARGIN:
+        raise ValueError(f"shift must be within +/-{PAN_MARGIN}px")
+
+    m = PAN_MARGIN
+    rng = np.random.default_rng(seed)
+    img = np.empty((h + 2 * m, w + 2 * m, 3), np.uint8)
+    img[:] = (150, 160, 165)
+    noise = rng.integers(-12, 12, img.shape[:2] + (1,), dtype=np.int16)
+    img = np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    # Background clutter gives ORB something to lock on to
+    for _ in range(120):
+        x, y = int(rng.integers(0, w + 2 * m)), int(rng.integers(0, m + h // 3))
+        color = tuple(int(c) for c in rng.integers(40, 220, 3))
+        cv2.rectangle(img, (x, y), (x + int(rng.integers(10, 80)), y + int(rng.integers(10, 80))), color, -1)
+
+    def at(fx, fy):
+        return int(w * fx) + m, int(h * fy) + m
+
+    cv2.rectangle(img, at(0.15, 0.45), at(0.85, 0.75), (40, 40, 160), -1)
+    cv2.rectangle(img, at(0.3, 0.32), at(0.7, 0.46), (70, 60, 140), -1)
+    cv2.rectangle(img, at(0.34, 0.34), at(0.48, 0.45), (200, 190, 170), -1)
+    cv2.rectangle(img, at(0.52, 0.34), at(0.66, 0.45), (200, 190, 170), -1)
+    for cx in (0.27, 0.73):
+        cv2.circle(img, at(cx, 0.76), int(h * 0.08), (20, 20, 20), -1)
+        cv2.circle(img, at(cx, 0.76), int(h * 0.035), (180, 180, 180), -1)
+
+    if dent:
+        cv2.ellipse(img, at(0.45, 0.6), (90, 50), 15, 0, 360, (90, 90, 200), -1)
+
+    # Content moves by (dx, dy) when the crop window moves the other way
+    return img[m - dy:m - dy + h, m - dx:m - dx + w].copy()
+
+
+def encode(img: np.ndarray, ext: str = ".jpg") -> bytes:
+    ok, buf = cv2.imencode(ext, img)
+    if not ok:
+        raise ValueError(f"Could not encode fixture as {ext}")
+    return buf.tobytes()
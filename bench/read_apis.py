@@ -0,0 +1,119 @@
+"""Benchmark the keyset read APIs against OFFSET pagination.
+
+Seeds `inspection_images` with synthetic rows (1M by default) and then walks
+pages for a sample of inspections both ways. Needs a real database (DB_HOST etc.)
+initialised with init_db.py:
+
+    python -m bench.read_apis --rows 1000000 --inspections 20000
+    python -m bench.read_apis --no-seed          # reuse an already seeded table
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.database import get_connection
+from app.utils.pagination import open_page
+
+SEED_BATCH = 10000
+IMAGE_TYPES = ["front", "back", "left", "right", "roof", "interior"]
+
+
+def seed(rows: int, inspections: int):
+    conn = get_connection()
+    cur = conn.cursor()
+    print(f"Seeding {rows} inspection_images rows across {inspections} inspections...")
+    start = time.perf_counter()
+    inserted = 0
+    while inserted < rows:
+        batch = []
+        for i in range(inserted, min(inserted + SEED_BATCH, rows)):
+            inspection_id = (i % inspections) + 1
+            image_type = IMAGE_TYPES[i % len(IMAGE_TYPES)]
+            path = f"/files/inspections/{inspection_id}/{image_type}.jpg"
+            batch.append((inspection_id, image_type, path, random.random(), "good"))
+        cur.executemany(
+            "INSERT INTO inspection_images (inspection_id, image_type, image_path, similarity, label) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            batch
+        )
+        conn.commit()
+        inserted += len(batch)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
+    cur.close()
+    conn.close()
+
+
+def walk_keyset(inspection_id: int, limit: int) -> int:
+    cursor = None
+    pages = 0
+    while True:
+        chunks = list(open_page(
+            "inspection_images", ["id", "image_type", "image_path", "similarity", "label"],
+            "inspection_id = %s", (inspection_id,), cursor, limit
+        ))
+        pages += 1
+        tail = chunks[-1]
+        if tail.endswith('"next_cursor":null}'):
+            return pages
+        cursor = int(tail.rsplit(":", 1)[1].rstrip("}"))
+
+
+def walk_offset(inspection_id: int, limit: int) -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    offset = 0
+    pages = 0
+    while True:
+        cur.execute(
+            "SELECT * FROM inspection_images WHERE inspection_id = %s ORDER BY id DESC LIMIT %s OFFSET %s",
+            (inspection_id, limit, offset)
+        )
+        rows = cur.fetchall()
+        pages += 1
+        if len(rows) < limit:
+            break
+        offset += limit
+    cur.close()
+    conn.close()
+    return pages
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    pages = fn(*args)
+    return (time.perf_counter() - start) * 1000, pages
+
+
+def report(name: str, samples: list):
+    per_page = sorted(ms / pages for ms, pages in samples)
+    p95 = per_page[int(len(per_page) * 0.95) - 1] if len(per_page) >= 20 else per_page[-1]
+    print(f"{name:8s} pages={sum(p for _, p in samples):6d} "
+          f"p50={statistics.median(per_page):7.2f}ms/page p95={p95:7.2f}ms/page")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--inspections", type=int, default=20_000)
+    parser.add_argument("--samples", type=int, default=50, help="inspections to walk")
+    parser.add_argument("--limit", type=int, default=10, help="page size")
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    is_mock = hasattr(conn, "is_mock")
+    conn.close()
+    if is_mock:
+        raise SystemExit("This benchmark needs a real database; set DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.")
+
+    if not args.no_seed:
+        seed(args.rows, args.inspections)
+
+    sample = random.sample(range(1, args.inspections + 1), min(args.samples, args.inspections))
+    report("keyset", [timed(walk_keyset, i, args.limit) for i in sample])
+    report("offset", [timed(walk_offset, i, args.limit) for i in sample])
+
+
+if __name__ == "__main__":
+    main()
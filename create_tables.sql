@@ -32,6 +32,9 @@ CREATE TABLE IF NOT EXISTS inspection_images (
     image_path VARCHAR(500) NOT NULL,
     similarity FLOAT DEFAULT 0.0,
     label VARCHAR(20),
+    thumb_path VARCHAR(500),
+    medium_path VARCHAR(500),
+    defect_boxes TEXT, -- JSON [[x, y, w, h], ...] in uploaded image pixels
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -44,3 +47,29 @@ CREATE TABLE IF NOT EXISTS submissions (
     comparison_text TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- 6. Submission Results Table (one row per analysis result, see /submissions)
+CREATE TABLE IF NOT EXISTS submission_results (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    submission_id BIGINT NOT NULL,
+    report_id BIGINT,
+    user_id VARCHAR(255),
+    position SMALLINT,
+    damage_type VARCHAR(100),
+    severity VARCHAR(20),
+    severity_score SMALLINT,
+    has_damage TINYINT
+);
+
+-- 7. Indexes for keyset-paginated reads (see app/utils/pagination.py)
+-- MySQL has no CREATE INDEX IF NOT EXISTS: on reruns init_db.py reports these
+-- as already existing and skips them.
+CREATE INDEX idx_inspections_user ON inspections (user_id, id);
+CREATE INDEX idx_inspection_images_inspection ON inspection_images (inspection_id, id);
+-- cars, reports and reportphotos come from the legacy schema, not this
+-- script; init_db.py skips their indexes if those tables are missing.
+CREATE INDEX idx_cars_user ON cars (userId, id);
+CREATE INDEX idx_reports_car ON reports (carId, id);
+CREATE INDEX idx_submission_results_user ON submission_results (user_id, damage_type);
+-- rescore.py syncs reportphotos.aiAnalysis by photoUrl (legacy table)
+CREATE INDEX idx_reportphotos_url ON reportphotos (photoUrl);
@@ -1,5 +1,6 @@
 import os
 import mysql.connector
+from mysql.connector import errorcode
 from dotenv import load_dotenv
 
 # Get the directory of this script (e:/taxi/backend)
@@ -45,7 +46,13 @@ try:
                     cursor.execute(statement)
                     print("Executed statement successfully.")
                 except mysql.connector.Error as err:
-                    print(f"Failed executing statement: {err}")
+                    # MySQL has no CREATE INDEX IF NOT EXISTS, so reruns hit these
+                    if err.errno == errorcode.ER_DUP_KEYNAME:
+                        print(f"Skipped, already exists: {err.msg}")
+                    elif err.errno == errorcode.ER_NO_SUCH_TABLE:
+                        print(f"Skipped, legacy table missing: {err.msg}")
+                    else:
+                        print(f"Failed executing statement: {err}")
                     
         conn.commit()
         print("✅ Database tables initialized.")
@@ -0,0 +1,189 @@
+"""Re-score stored inspection images after changing the threshold or ideal image.
+
+Streams inspection_images in id order, loads each image from files/ (or blob
+storage), scores it against the ideal image in a process pool and writes
+similarity/label/defect_boxes back, plus reportphotos.aiAnalysis. Progress is
+checkpointed after every batch so an interrupted run resumes where it stopped.
+
+    python rescore.py --threshold 0.85
+    python rescore.py --ideal files/ideal_v2.png --workers 8 --restart
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+from azure.storage.blob import BlobServiceClient
+
+from app.database import get_config, get_connection
+from app.utils import fastjson
+from app.utils.align import content_hash
+from app.utils.compare import DEFECT_THRESHOLD, label_for, load_gray, score_against
+from app.utils.storage import IDEAL_PATH, read_stored_image
+
+_reference = None
+
+
+def _init_worker(ideal_path):
+    # Each worker decodes the ideal image once; its keypoints are then cached in-process
+    global _reference
+    _reference = load_gray(ideal_path)
+
+
+def _score(data):
+    test = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if test is None:
+        return None
+    ideal, ideal_key = _reference
+    return score_against(ideal, ideal_key, test, content_hash(data))
+
+
+def _load(blob_service_client, container_name, row):
+    image_id, url = row
+    try:
+        return image_id, url, read_stored_image(url, blob_service_client, container_name)
+    except Exception as e:
+        print(f"WARNING: Could not load image {image_id} ({url}): {e}", flush=True)
+        return image_id, url, None
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def ensure_photo_url_index(cur):
+    # reportphotos is updated by photoUrl; without an index each UPDATE scans the table
+    try:
+        cur.execute("SHOW INDEX FROM reportphotos")
+        if "idx_reportphotos_url" not in {row[2] for row in cur.fetchall()}:
+            print("Creating index idx_reportphotos_url on reportphotos (photoUrl)...", flush=True)
+            cur.execute("CREATE INDEX idx_reportphotos_url ON reportphotos (photoUrl)")
+    except Exception as e:
+        print(f"WARNING: Could not index reportphotos.photoUrl: {e}", flush=True)
+
+
+def fetch_batch(cur, after_id, batch_size):
+    cur.execute(
+        "SELECT id, image_path FROM inspection_images WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, batch_size)
+    )
+    return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideal", default=IDEAL_PATH, help="reference image (default: files/ideal.png)")
+    parser.add_argument("--threshold", type=float, default=DEFECT_THRESHOLD, help="SSIM below this is 'defective'")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="scoring processes")
+    parser.add_argument("--io-threads", type=int, default=16, help="image download/prefetch threads")
+    parser.add_argument("--checkpoint", default="rescore.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    ideal, ideal_key = load_gray(args.ideal)
+    if ideal is None:
+        raise SystemExit(f"Ideal image not found: {args.ideal}")
+
+    conn = get_connection()
+    if hasattr(conn, "is_mock"):
+        raise SystemExit("Re-scoring needs a real database; set DB_HOST/DB_USER/DB_PASSWORD/DB_NAME.")
+    cur = conn.cursor()
+    ensure_photo_url_index(cur)
+
+    connection_string = get_config("AZURE_CONNECTION_STRING")
+    blob_service_client = BlobServiceClient.from_connection_string(connection_string) if connection_string else None
+    load = partial(_load, blob_service_client, get_config("AZURE_CONTAINER_NAME") or "uploads")
+
+    state = None if args.restart else load_checkpoint(args.checkpoint)
+    if state and (state.get("ideal_hash") != ideal_key or state.get("threshold") != args.threshold):
+        print("Checkpoint was written for a different ideal image/threshold; starting over.")
+        state = None
+    state = state or {"last_id": 0, "scored": 0, "missing": 0, "ideal_hash": ideal_key, "threshold": args.threshold}
+    if state["last_id"]:
+        print(f"Resuming after inspection_images.id={state['last_id']} ({state['scored']} already scored)")
+
+    started = time.perf_counter()
+    scored_this_run = 0
+
+    with ThreadPoolExecutor(args.io_threads) as io_pool, \
+            ProcessPoolExecutor(
+                args.workers,
+                # Workers start lazily while prefetch threads are mid-download;
+                # forking a process with live threads can deadlock the child
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(args.ideal,)
+            ) as cpu_pool:
+        rows = fetch_batch(cur, state["last_id"], args.batch_size)
+        # Images for the next batch download while the current one is scored
+        pending = list(io_pool.map(load, rows)) if rows else []
+
+        while pending:
+            batch = pending
+            next_rows = fetch_batch(cur, batch[-1][0], args.batch_size)
+            prefetch = [io_pool.submit(load, row) for row in next_rows]
+
+            loaded = [(image_id, url, data) for image_id, url, data in batch if data]
+            results = cpu_pool.map(_score, [data for _, _, data in loaded], chunksize=4)
+
+            image_updates = []
+            photo_updates = []
+            for (image_id, url, _), result in zip(loaded, results):
+                if result is None:
+                    continue
+                similarity, boxes = result
+                label = label_for(similarity, args.threshold)
+                image_updates.append((similarity, label, fastjson.dumps(boxes), image_id))
+                photo_updates.append((label, url))
+
+            if image_updates:
+                cur.executemany(
+                    "UPDATE inspection_images SET similarity = %s, label = %s, defect_boxes = %s WHERE id = %s",
+                    image_updates
+                )
+                try:
+                    cur.executemany("UPDATE reportphotos SET aiAnalysis = %s WHERE photoUrl = %s", photo_updates)
+                except Exception as e:
+                    print(f"Legacy Sync Error (reportphotos): {e}", flush=True)
+            conn.commit()
+
+            state["last_id"] = batch[-1][0]
+            state["scored"] += len(image_updates)
+            state["missing"] += len(batch) - len(image_updates)
+            save_checkpoint(args.checkpoint, state)
+
+            scored_this_run += len(image_updates)
+            elapsed = time.perf_counter() - started
+            print(
+                f"id<={state['last_id']}: {state['scored']} scored, {state['missing']} missing, "
+                f"{scored_this_run / elapsed:.1f} images/s",
+                flush=True
+            )
+
+            pending = [f.result() for f in prefetch]
+
+    cur.close()
+    conn.close()
+    elapsed = time.perf_counter() - started
+    print(f"Done: {scored_this_run} images re-scored in {elapsed:.1f}s ({scored_this_run / max(elapsed, 1e-9):.1f} images/s)")
+
+
+if __name__ == "__main__":
+    main()
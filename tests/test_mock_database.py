@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from app import database
+from app.database import MockConnection, translate_mysql
+from app.utils.otp import generate_otp, verify_otp
+
+
+@pytest.fixture(autouse=True)
+def fresh_mock_db(monkeypatch):
+    monkeypatch.delenv("DB_HOST", raising=False)
+    monkeypatch.setattr(database, "_mock_db", None)
+
+
+def run(query, params=()):
+    cur = MockConnection().cursor()
+    cur.execute(query, params)
+    return cur
+
+
+def test_otp_upsert_with_from_unixtime():
+    generate_otp("+15550001")
+    generate_otp("+15550001")  # second call takes the ON DUPLICATE KEY UPDATE branch
+    assert run("SELECT COUNT(*) FROM otps WHERE phone = %s", ("+15550001",)).fetchone() == (1,)
+    assert verify_otp("+15550001", "9755")
+    assert not verify_otp("+15550001", "9755")  # deleted once used
+
+
+def test_values_rewritten_only_after_on_duplicate_key_update():
+    assert translate_mysql("INSERT INTO t (a) VALUES(1)") == "INSERT INTO t (a) VALUES(1)"
+    assert translate_mysql(
+        "INSERT INTO t (a, b) VALUES(%s, %s) ON DUPLICATE KEY UPDATE b = VALUES(b)"
+    ) == "INSERT INTO t (a, b) VALUES(?, ?) ON CONFLICT DO UPDATE SET b = excluded.b"
+
+
+def test_quoted_literals_left_alone():
+    assert translate_mysql("SELECT * FROM cars WHERE model LIKE '%sedan%' AND id = %s") == \
+        "SELECT * FROM cars WHERE model LIKE '%sedan%' AND id = ?"
+    assert translate_mysql("SELECT 'ON DUPLICATE KEY UPDATE VALUES(x)'") == \
+        "SELECT 'ON DUPLICATE KEY UPDATE VALUES(x)'"
+
+    run("CREATE TABLE models (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(50))")
+    run("INSERT INTO models (name) VALUES (%s), (%s)", ("sedan", "coupe"))
+    assert run("SELECT name FROM models WHERE name LIKE '%sedan%' AND id > %s", (0,)).fetchall() == [("sedan",)]
+
+
+def test_describe():
+    rows = run("DESCRIBE users").fetchall()
+    fields = [row[0] for row in rows]
+    assert fields == ["id", "phone", "name", "email", "isVerified", "createdAt", "updatedAt"]
+    assert rows[0][3] == "PRI"
+
+
+def test_show_index_on_missing_table_raises():
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        run("SHOW INDEX FROM no_such_table")
+
+
+def test_show_index_lists_indexes():
+    run("CREATE TABLE widgets (id INTEGER PRIMARY KEY, owner VARCHAR(50))")
+    run("CREATE INDEX idx_widgets_owner ON widgets (owner)")
+    assert "idx_widgets_owner" in [row[2] for row in run("SHOW INDEX FROM widgets").fetchall()]
+
+
+def test_lastrowid():
+    assert run("INSERT INTO users (phone) VALUES (%s)", ("+15550002",)).lastrowid == 1
+    assert run("INSERT INTO users (phone) VALUES (%s)", ("+15550003",)).lastrowid == 2
+
+
+def test_users_bootstrapped_before_demo_login():
+    # /auth/demo-login's 2-column CREATE must not leave verify-otp without isVerified
+    run("CREATE TABLE IF NOT EXISTS users (id BIGINT AUTO_INCREMENT PRIMARY KEY, phone VARCHAR(255))")
+    run("INSERT INTO users (phone, isVerified) VALUES (%s, 1)", ("+15550004",))
+    assert run("SELECT isVerified FROM users WHERE phone = %s", ("+15550004",)).fetchone() == (1,)